@@ -106,7 +106,8 @@ setup(name=PACKAGENAME,
       version=VERSION,
       description=DESCRIPTION,
       scripts=scripts,
-      install_requires=['astropy>=3', 'ginga>=2.7', 'scipy>=0.18'],
+      install_requires=['numpy>=1.17', 'astropy>=3', 'ginga>=2.7',
+                        'scipy>=0.18'],
       author=AUTHOR,
       author_email=AUTHOR_EMAIL,
       license=LICENSE,
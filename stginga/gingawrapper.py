@@ -36,7 +36,7 @@ def run_stginga(sys_argv):
     # Note: Unable to get this to work from within ginga_config.py
     # Example:
     #     glb_plg_to_remove = ['WBrowser', 'RC', 'SAMP', 'IRAF']
-    plg_to_remove = []
+    plg_to_remove = ['ChangeHistory']
     _remove_plugins(plg_to_remove, gmain.plugins)
 
     # Add custom plugins.
@@ -40,7 +40,10 @@ def load_plugins(ginga):
 def _get_stginga_plugins():
     gpfx = 'stginga.plugins'  # To load custom plugins in Ginga namespace
 
-    global_plugins = []
+    global_plugins = [
+        Bunch(module='ChangeHistory', tab='History', workspace='right',
+              pfx=gpfx, category='Custom', ptype='global'),
+        ]
     local_plugins = [
         Bunch(module='BackgroundSub', workspace='dialogs', pfx=gpfx,
               category='Custom', ptype='local'),
@@ -871,6 +871,8 @@ class BackgroundSub(HelpMixin, LocalPlugin, MEFMixin, ParamMixin):
         self.fv.show_status('Draw a region with the left mouse button')
 
     def stop(self):
+        self.close_fits_handles()
+
         # remove the canvas from the image
         p_canvas = self.fitsimage.get_canvas()
         try:
@@ -807,7 +807,7 @@ class BadPixCorr(HelpMixin, LocalPlugin, MEFMixin, ParamMixin):
             s += 'x={0}, y={1}, r={2}'.format(
                 self.xcen, self.ycen, self.radius)
         else:  # single pixel
-            mask = np.zeros(data.shape, dtype=np.bool)
+            mask = np.zeros(data.shape, dtype=np.bool_)
             xx = int(self.xcen)
             yy = int(self.ycen)
             mask[yy, xx] = True
@@ -1028,6 +1028,8 @@ class BadPixCorr(HelpMixin, LocalPlugin, MEFMixin, ParamMixin):
         self.fv.show_status('Draw a region with the left mouse button')
 
     def stop(self):
+        self.close_fits_handles()
+
         # remove the canvas from the image
         p_canvas = self.fitsimage.get_canvas()
         try:
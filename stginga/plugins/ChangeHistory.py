@@ -0,0 +1,773 @@
+"""
+Keep track of buffer change history.
+
+**Plugin Type: Global**
+
+``ChangeHistory`` is a global plugin. Only one instance can be opened.
+
+**Usage**
+
+This plugin is used to log any changes to data buffer. For example,
+a change log would appear here if a new image is added to a mosaic via the
+``MosaicAuto`` plugin. Like ``Contents``, the log is sorted by channel,
+and then by image name.
+
+History should stay no matter what channel or image is active.
+New history can be added, but old history cannot be deleted,
+unless the image/channel itself is deleted or the per-image history
+cap (``max_entries_per_image``) is reached, in which case the oldest
+entries for that image are dropped first.
+
+The ``image_modified_cb()`` method picks up an ``'add-image-info'`` event
+and displays related metadata here. The metadata is obtained as follows::
+
+    channel = self.fv.get_channel_info(chname)
+    iminfo = channel.get_image_info(imname)
+    timestamp = iminfo.time_modified
+    description = iminfo.reason_modified  # Optional
+
+Both ``'time_modified'`` and ``'reason_modified'`` have to be explicitly set
+by the calling plugin in the same method that issues the
+``'add-image-info'`` callback, like this::
+
+    # This changes the data buffer
+    image.set_data(new_data, ...)
+    # Add description for ChangeHistory
+    info = dict(time_modified=datetime.utcnow(),
+                reason_modified='Data has changed')
+    self.fv.update_image_info(image, info)
+
+This is a faster variant of the ``ChangeHistory`` plugin distributed with
+Ginga. Table-of-contents rebuilds caused by bursts of modification events
+(e.g., batch pixel operations) are coalesced into a single refresh, so the
+treeview is only rebuilt once per burst instead of once per event.
+
+"""
+# STDLIB
+import threading
+import time
+from contextlib import contextmanager
+
+# GINGA
+from ginga.GingaPlugin import GlobalPlugin
+from ginga.gw import Widgets
+from ginga.util.iohelper import shorten_name
+
+# STGINGA
+from stginga.plugins.local_plugin_mixin import HelpMixin
+
+__all__ = ['ChangeHistory']
+
+
+class _HistoryEntry(object):
+    """Lightweight record for one history entry.
+
+    Slot-based stand-in for ``Bunch.Bunch``; several times smaller and
+    faster to construct, which adds up for histories with many
+    thousands of entries. Implements just enough of the mapping
+    protocol for Ginga's TreeView to render it as a leaf node.
+
+    """
+    __slots__ = ('CHNAME', 'NAME', 'MODIFIED', 'DESCRIP')
+
+    def __init__(self, chname, name, modified, descrip):
+        self.CHNAME = chname
+        self.NAME = name
+        self.MODIFIED = modified
+        self.DESCRIP = descrip
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def keys(self):
+        return self.__slots__
+
+    def update(self, other):
+        for key in other.keys():
+            setattr(self, key, other[key])
+
+
+class ChangeHistory(HelpMixin, GlobalPlugin):
+
+    def __init__(self, fv):
+        # superclass defines some variables for us, like logger
+        super(ChangeHistory, self).__init__(fv)
+
+        self.help_url = ('http://stginga.readthedocs.io/en/latest/stginga/'
+                         'plugins_manual/changehistory.html')
+
+        self.columns = [('Timestamp (UTC)', 'MODIFIED'),
+                        ('Description', 'DESCRIP')]
+
+        # Guards the flat log, index, cached view and pending queues.
+        # Modification callbacks may arrive on non-GUI threads; only
+        # the widget updates are marshaled to the GUI thread, so the
+        # event producer never waits on a redraw.
+        self._lock = threading.Lock()
+
+        # Flat history log. Appending an event is O(1); the nested
+        # name_dict view consumed by the treeview is built lazily from
+        # it. Removed entries are tombstoned with None and the log is
+        # compacted once tombstones accumulate.
+        self._entries = []
+        self._n_dead = 0
+        # Case-insensitive index: {chname: {imname: [entry indices]}}
+        self._index = {}
+        # Memoized str.lower() results; channel/image names repeat
+        # constantly in the hot callbacks, so each distinct name is
+        # lowercased (a new str allocation) only once
+        self._lower_cache = {}
+
+        # Path of the entry shown in the detail pane, as lowercased
+        # (chname, imname, timestamp); None if nothing is selected
+        self._selected_path = None
+        # Cached nested view; None means it must be rebuilt on demand
+        self._name_dict = None
+
+        # For table-of-contents pane
+        self.treeview = None
+
+        # Set for real in build_gui(), once the backend is known
+        self._freeze = self._thaw = lambda: None
+        self._info_freeze = self._info_thaw = lambda: None
+
+        prefs = self.fv.get_preferences()
+        self.settings = prefs.create_category('plugin_ChangeHistory')
+        self.settings.add_defaults(always_expand=False,
+                                   color_alternate_rows=True,
+                                   sortable=False,
+                                   ts_colwidth=250,
+                                   refresh_delay=0.1,
+                                   max_entries_per_image=500)
+        self.settings.load(onError='silent')
+
+        # History is kept as a per-image ring buffer so long-running
+        # sessions do not grow (and redraw) without bound; 0 disables
+        # the cap.
+        self._max_per_image = self.settings.get('max_entries_per_image', 500)
+
+        # When always_expand is False, only channel rows are realized
+        # up front and their subtrees are filled in on expansion (and
+        # unloaded again on collapse). These track which channel rows
+        # exist and which subtrees are currently populated.
+        self._lazy_expand = False
+        self._ch_rows = set()
+        self._populated = set()
+
+        # Bursts of modification events (e.g., batch pixel operations)
+        # are coalesced into a single deferred TOC refresh, instead of
+        # rebuilding the treeview once per event.
+        self._refresh_pending = False
+        self._refresh_delay = self.settings.get('refresh_delay', 0.1)
+        self._refresh_timer = fv.get_timer()
+        self._refresh_timer.set_callback('expired', self._refresh_timer_cb)
+        self._last_refresh_t = 0.0  # time.monotonic() of last refresh
+
+        # New leaves accumulated since the last refresh. The deferred
+        # refresh grafts only these onto the existing tree instead of
+        # rebuilding the whole model from name_dict. Leaves evicted by
+        # the ring buffer are likewise batched up for removal.
+        self._pending_inserts = {}
+        self._pending_deletes = {}
+
+        # True when the displayed tree is stale and needs a full
+        # rebuild; set when updates arrive while the plugin tab is
+        # hidden, so no model work is done for a tree nobody can see.
+        self._dirty = False
+
+        fv.add_callback('add-image-info', self.image_modified_cb)
+        fv.add_callback('remove-image-info', self.remove_image_cb)
+        fv.add_callback('delete-channel', self.delete_channel_cb)
+
+        self.gui_up = False
+
+    def build_gui(self, container):
+        vbox, sw, self.orientation = Widgets.get_oriented_box(container)
+        vbox.set_border_width(4)
+        vbox.set_spacing(2)
+
+        # Create the Treeview.
+        # Timestamps are generated monotonically, so insertion order is
+        # already chronological; runtime sorting (an O(n log n) walk on
+        # every tree update) is off unless the user asks for it.
+        always_expand = self.settings.get('always_expand', True)
+        color_alternate = self.settings.get('color_alternate_rows', True)
+        sortable = self.settings.get('sortable', False)
+        treeview = Widgets.TreeView(auto_expand=always_expand,
+                                    sortable=sortable,
+                                    use_alt_row_color=color_alternate)
+        self.treeview = treeview
+        treeview.setup_table(self.columns, 3, 'MODIFIED')
+        treeview.set_column_width(0, self.settings.get('ts_colwidth', 250))
+        treeview.add_callback('selected', self.show_more)
+        vbox.add_widget(treeview, stretch=1)
+
+        # Detect the incremental tree API once; all mutation paths
+        # go through _model_insert/_model_delete below
+        self._can_increment = (hasattr(treeview, 'add_tree') and
+                               hasattr(treeview, 'delete_tree'))
+
+        # Lazy subtree population needs the incremental tree API
+        self._lazy_expand = not always_expand and self._can_increment
+        if self._lazy_expand:
+            treeview.add_callback('expanded', self._expand_cb)
+            treeview.add_callback('collapsed', self._collapse_cb)
+
+        # Detect backend support for freezing repaints once, so batch
+        # mutations can repaint the treeview only once at the end.
+        self._freeze, self._thaw = self._get_freeze_funcs(treeview)
+
+        fr = Widgets.Frame('Selected History')
+
+        captions = (('Channel:', 'label', 'chname', 'llabel'),
+                    ('Image:', 'label', 'imname', 'llabel'),
+                    ('Timestamp:', 'label', 'modified', 'llabel'))
+        w, b = Widgets.build_info(captions)
+        self.w.update(b)
+
+        b.chname.set_text('')
+        b.chname.set_tooltip('Channel name')
+
+        b.imname.set_text('')
+        b.imname.set_tooltip('Image name')
+
+        b.modified.set_text('')
+        b.modified.set_tooltip('Timestamp (UTC)')
+
+        captions = (('Description:-', 'llabel'), ('descrip', 'textarea'))
+        w2, b = Widgets.build_info(captions)
+        self.w.update(b)
+
+        b.descrip.set_editable(False)
+        b.descrip.set_wrap(True)
+        b.descrip.set_text('')
+        b.descrip.set_tooltip('Displays selected history entry')
+
+        vbox2 = Widgets.VBox()
+        vbox2.set_border_width(4)
+        vbox2.add_widget(w)
+        vbox2.add_widget(w2)
+
+        # Same trick as for the treeview: repaint the 'Selected History'
+        # pane once per selection event, not once per label update
+        self._info_freeze, self._info_thaw = self._get_freeze_funcs(vbox2)
+
+        fr.set_widget(vbox2, stretch=0)
+        vbox.add_widget(fr, stretch=0)
+
+        container.add_widget(vbox, stretch=1)
+
+        btns = Widgets.HBox()
+        btns.set_spacing(3)
+
+        btn = Widgets.Button('Close')
+        btn.add_callback('activated', lambda w: self.close())
+        btns.add_widget(btn, stretch=0)
+        btn = Widgets.Button('Help')
+        btn.add_callback('activated', lambda w: self.help())
+        btns.add_widget(btn, stretch=0)
+        btns.add_widget(Widgets.Label(''), stretch=1)
+
+        container.add_widget(btns, stretch=0)
+
+        self.gui_up = True
+
+    def clear_selected_history(self):
+        self._selected_path = None
+
+        if not self.gui_up:
+            return
+
+        with self._frozen_info():
+            self.w.chname.set_text('')
+            self.w.imname.set_text('')
+            self.w.modified.set_text('')
+            self.w.descrip.set_text('')
+
+    @property
+    def name_dict(self):
+        """Nested ``{chname: {imname: {timestamp: entry}}}`` view of the
+        history, (re)built lazily from the flat entry log."""
+        if self._name_dict is None:
+            with self._lock:
+                name_dict = {}
+                for bnch in self._entries:
+                    if bnch is None:  # Tombstone
+                        continue
+                    file_dict = name_dict.setdefault(bnch.CHNAME, {})
+                    file_dict.setdefault(bnch.NAME, {})[bnch.MODIFIED] = bnch
+                self._name_dict = name_dict
+        return self._name_dict
+
+    def _lc(self, name):
+        """Cached ``name.lower()`` for index/set keys."""
+        try:
+            return self._lower_cache[name]
+        except KeyError:
+            if len(self._lower_cache) > 1024:  # Paranoia; names are few
+                self._lower_cache.clear()
+            return self._lower_cache.setdefault(name, name.lower())
+
+    def _kill_entries(self, indices):
+        """Tombstone the given flat-log indices."""
+        for i in indices:
+            self._entries[i] = None
+        self._n_dead += len(indices)
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        """Compact the flat log when at least half of it is tombstones."""
+        if self._n_dead < 64 or self._n_dead * 2 < len(self._entries):
+            return
+
+        self._entries = [bnch for bnch in self._entries if bnch is not None]
+        self._n_dead = 0
+
+        index = {}
+        for i, bnch in enumerate(self._entries):
+            file_dict = index.setdefault(self._lc(bnch.CHNAME), {})
+            file_dict.setdefault(self._lc(bnch.NAME), []).append(i)
+        self._index = index
+
+    @staticmethod
+    def _get_freeze_funcs(treeview):
+        """Return ``(freeze, thaw)`` callables for the native widget of
+        the given treeview, or no-ops if the backend has neither Qt's
+        ``setUpdatesEnabled()`` nor Gtk's ``freeze_child_notify()``."""
+        try:
+            native = treeview.get_widget()
+        except Exception:
+            native = None
+
+        if hasattr(native, 'setUpdatesEnabled'):  # Qt
+            return (lambda: native.setUpdatesEnabled(False),
+                    lambda: native.setUpdatesEnabled(True))
+        if hasattr(native, 'freeze_child_notify'):  # Gtk
+            return native.freeze_child_notify, native.thaw_child_notify
+        return (lambda: None, lambda: None)
+
+    @contextmanager
+    def _frozen_updates(self):
+        """Suppress intermediate treeview repaints for the duration."""
+        self._freeze()
+        try:
+            yield
+        finally:
+            self._thaw()
+
+    @contextmanager
+    def _frozen_info(self):
+        """Suppress intermediate 'Selected History' pane repaints."""
+        self._info_freeze()
+        try:
+            yield
+        finally:
+            self._info_thaw()
+
+    def _is_tab_visible(self):
+        """Whether the plugin GUI is actually visible (e.g., its tab is
+        raised). Backends that cannot tell are assumed visible."""
+        if self.treeview is None:
+            return False
+        try:
+            return self.treeview.is_visible()
+        except Exception:
+            return True
+
+    # Dummy leaf kept under unpopulated channel rows. Without a child,
+    # neither Qt nor Gtk draws an expander arrow, so the 'expanded'
+    # callback that grafts the real subtree could never fire.
+    _dummy_key = '...'
+
+    def _placeholder_subtree(self):
+        return {self._dummy_key: {'MODIFIED': self._dummy_key,
+                                  'DESCRIP': ''}}
+
+    def recreate_toc(self):
+        self.logger.debug('Recreating table of contents...')
+        self._dirty = False
+        self._pending_inserts = {}
+        self._pending_deletes = {}
+        name_dict = self.name_dict
+        self._ch_rows = set(self._lc(key) for key in name_dict)
+        self._populated = set()
+        with self._frozen_updates():
+            if self._lazy_expand:
+                # Realize only the channel rows, each with a dummy
+                # child so the expander exists; the real subtree is
+                # filled in when the user actually expands it.
+                self.treeview.set_tree(
+                    dict((chname, self._placeholder_subtree())
+                         for chname in name_dict))
+            else:
+                self.treeview.set_tree(name_dict)
+                self._populated = set(self._ch_rows)
+
+    def _expand_cb(self, widget, path):
+        """Fill in a channel subtree the first time it is expanded."""
+        if len(path) != 1:
+            return
+
+        key = self._lc(path[0])
+        if key in self._populated:
+            return
+
+        subtree = self.name_dict.get(path[0], None)
+        if not subtree:
+            return
+
+        self._populated.add(key)
+        self._model_insert({path[0]: subtree})
+        self._model_delete({path[0]: {self._dummy_key: {}}},
+                           prune_empty=False)
+
+    def _collapse_cb(self, widget, path):
+        """Unload a collapsed channel subtree so widget memory stays
+        bounded."""
+        if len(path) != 1 or self._lc(path[0]) not in self._populated:
+            return
+
+        self._populated.discard(self._lc(path[0]))
+        subtree = self.name_dict.get(path[0], {})
+        self._model_delete(
+            {path[0]: dict((imname, {}) for imname in subtree)},
+            prune_empty=False)
+        # Reset the placeholder so the row can be expanded again
+        self._model_insert({path[0]: self._placeholder_subtree()})
+
+    def _model_insert(self, tree_dict):
+        """Graft the given subtree onto the existing tree model.
+        Returns `False` if the backend cannot update incrementally."""
+        if not self._can_increment:
+            return False
+        with self._frozen_updates():
+            self.treeview.add_tree(tree_dict)
+        return True
+
+    def _model_delete(self, tree_dict, prune_empty=True):
+        """Drop the given subtree from the existing tree model.
+        Returns `False` if the backend cannot update incrementally."""
+        if not self._can_increment:
+            return False
+        with self._frozen_updates():
+            self.treeview.delete_tree(tree_dict, prune_empty=prune_empty)
+        return True
+
+    def _insert_node(self, chname, imname, timestamp, bnch):
+        """Queue a single new leaf to be grafted onto the tree."""
+        file_dict = self._pending_inserts.setdefault(chname, {})
+        file_dict.setdefault(imname, {})[timestamp] = bnch
+        self._schedule_refresh()
+
+    def _queue_delete(self, path):
+        """Queue removal of a single stale leaf, applied with the next
+        refresh."""
+        # Forget a not-yet-flushed insert of the same leaf, if any
+        node = self._pending_inserts
+        try:
+            for key in path[:-1]:
+                node = node[key]
+            del node[path[-1]]
+        except KeyError:
+            pass
+
+        node = self._pending_deletes
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = {}
+        self._schedule_refresh()
+
+    def _remove_subtree(self, path):
+        """Drop the subtree at the given ``(chname, ...)`` path from the
+        tree, without rebuilding the rest of the model."""
+        # Also forget not-yet-flushed inserts under that path
+        node = self._pending_inserts
+        try:
+            for key in path[:-1]:
+                node = node[key]
+            del node[path[-1]]
+        except KeyError:
+            pass
+
+        if len(path) == 1:
+            key = self._lc(path[0])
+            self._ch_rows.discard(key)
+            self._populated.discard(key)
+
+        if not self.gui_up:
+            return
+
+        # While hidden, just flag the tree stale; it is rebuilt once
+        # when the tab is visible again.
+        if not self._is_tab_visible():
+            self._dirty = True
+            self._schedule_refresh()
+            return
+
+        subtree = {}
+        node = subtree
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = {}
+        if not self._model_delete(subtree):  # Older Ginga
+            self._dirty = True
+            self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        """Coalesce treeview updates from a burst of events into one."""
+        if not self.gui_up or self._refresh_pending:
+            return
+
+        self._refresh_pending = True
+
+        # Refresh right away if the last one was long enough ago, so a
+        # lone event shows up without artificial latency; otherwise wait
+        # out the rest of the frame budget, which caps the effective
+        # redraw rate at 1/refresh_delay Hz during event storms.
+        dt = time.monotonic() - self._last_refresh_t
+        if dt >= self._refresh_delay:
+            self.fv.gui_do(self._do_refresh)
+        else:
+            self._refresh_timer.set(self._refresh_delay - dt)
+
+    def _refresh_timer_cb(self, timer):
+        self.fv.gui_do(self._do_refresh)
+
+    def _do_refresh(self):
+        self._refresh_pending = False
+        self._last_refresh_t = time.monotonic()
+        if not self.gui_up:
+            return
+
+        # No model work while the tab is hidden; poll until it is
+        # raised again, then catch up in one go.
+        if not self._is_tab_visible():
+            self._refresh_pending = True
+            self._refresh_timer.set(max(self._refresh_delay, 0.25))
+            return
+
+        # Prune leaves evicted by the ring buffer in one batch
+        if self._pending_deletes and not self._dirty:
+            with self._lock:
+                deletes, self._pending_deletes = self._pending_deletes, {}
+            if not self._model_delete(deletes, prune_empty=False):
+                self._dirty = True
+
+        # Graft only the new leaves onto the existing model, if the
+        # backend supports it; otherwise fall back to a full rebuild.
+        if (not self._dirty and self._pending_inserts and
+                self._can_increment):
+            with self._lock:
+                pending, self._pending_inserts = self._pending_inserts, {}
+
+            if self._lazy_expand:
+                # Collapsed subtrees are not realized; just make sure
+                # the channel rows exist. Their contents are grafted on
+                # expansion from name_dict.
+                lazy_pending = {}
+                for chname, file_dict in pending.items():
+                    key = self._lc(chname)
+                    if key not in self._ch_rows:
+                        self._ch_rows.add(key)
+                        lazy_pending[chname] = self._placeholder_subtree()
+                    elif key in self._populated:
+                        lazy_pending[chname] = file_dict
+                pending = lazy_pending
+                if not pending:
+                    return
+
+            with self._frozen_updates():
+                self.treeview.add_tree(pending)
+        else:
+            self.recreate_toc()
+
+    def show_more(self, widget, res_dict):
+        # Only the path keys are taken from the widget-built result;
+        # the entry itself is fetched from our own store, so the widget
+        # never has to materialize the selected subtree.
+        try:
+            chname = next(iter(res_dict))
+            imname = next(iter(res_dict[chname]))
+            timestamp = next(iter(res_dict[chname][imname]))
+        except Exception:  # The drop-down row is selected, nothing to show
+            return
+
+        try:
+            bnch = self.name_dict[chname][imname][timestamp]
+        except KeyError:  # Selection raced with a removal
+            return
+
+        self._selected_path = (self._lc(chname), self._lc(imname), timestamp)
+
+        # Display on GUI
+        with self._frozen_info():
+            self.w.chname.set_text(chname)
+            self.w.imname.set_text(shorten_name(imname, 25))
+            self.w.modified.set_text(timestamp)
+            self.w.descrip.set_text(bnch.DESCRIP)
+
+    def image_modified_cb(self, gshell, channel, iminfo):
+        """Add an entry with image modification info."""
+        timestamp = iminfo.time_modified
+
+        if timestamp is None:
+            # Not an image we are interested in tracking
+            return
+
+        chname = channel.name
+        imname = iminfo.name
+
+        # Z: Zulu time, GMT, UTC.
+        # Formatted directly from the datetime fields; this is several
+        # times cheaper than strftime(), which goes through the
+        # locale-aware C machinery on every event.
+        timestamp = '%04d-%02d-%02d %02d:%02d:%02dZ' % (
+            timestamp.year, timestamp.month, timestamp.day,
+            timestamp.hour, timestamp.minute, timestamp.second)
+        reason = iminfo.get('reason_modified', 'Not given')
+        bnch = _HistoryEntry(chname, imname, timestamp, reason)
+
+        with self._lock:
+            # O(1) append to the flat log
+            idx = len(self._entries)
+            self._entries.append(bnch)
+            file_dict = self._index.setdefault(self._lc(chname), {})
+            indices = file_dict.setdefault(self._lc(imname), [])
+            indices.append(idx)
+
+            # Ring buffer: evict the oldest entry for this image once
+            # over the cap, so per-image history (and tree size) stays
+            # bounded
+            if 0 < self._max_per_image < len(indices):
+                old_idx = indices.pop(0)
+                old = self._entries[old_idx]
+                self._kill_entries((old_idx,))
+
+                if self._name_dict is not None:
+                    try:
+                        del self._name_dict[old.CHNAME][old.NAME][
+                            old.MODIFIED]
+                    except KeyError:
+                        pass
+
+                self._queue_delete((old.CHNAME, old.NAME, old.MODIFIED))
+
+            # Keep the cached nested view in sync, if it has been built.
+            # Timestamp is guaranteed to be unique?
+            if self._name_dict is not None:
+                ch_dict = self._name_dict.setdefault(chname, {})
+                ch_dict.setdefault(imname, {})[timestamp] = bnch
+
+            self._insert_node(chname, imname, timestamp, bnch)
+
+        self.logger.debug("Added history for chname='{0}' imname='{1}' "
+                          "timestamp='{2}'".format(chname, imname, timestamp))
+
+    def remove_image_cb(self, gshell, channel, iminfo):
+        """Delete entries related to deleted image."""
+        with self._lock:
+            ch_key = self._lc(channel.name)
+            file_dict = self._index.get(ch_key, None)
+            if file_dict is None:
+                return
+
+            indices = file_dict.pop(self._lc(iminfo.name), None)
+            if indices is None:
+                return
+
+            if not file_dict:
+                del self._index[ch_key]
+
+            # Entries remember the display-case names for the tree
+            chname = self._entries[indices[0]].CHNAME
+            name = self._entries[indices[0]].NAME
+            self._kill_entries(indices)
+
+            if self._name_dict is not None:
+                ch_dict = self._name_dict.get(chname, None)
+                if ch_dict is not None:
+                    ch_dict.pop(name, None)
+                    if not ch_dict:
+                        del self._name_dict[chname]
+
+        self.logger.debug('{0} removed from ChangeHistory'.format(name))
+
+        if not self.gui_up:
+            return False
+
+        # Only wipe the detail pane if it shows the removed image
+        if (self._selected_path is not None and
+                self._selected_path[:2] == (ch_key, self._lc(name))):
+            self.clear_selected_history()
+        self._remove_subtree((chname, name))
+
+    def delete_channel_cb(self, gshell, chinfo):
+        """Called when a channel is deleted from the main interface.
+        Parameter is chinfo (a bunch)."""
+        with self._lock:
+            file_dict = self._index.pop(self._lc(chinfo.name), None)
+            if file_dict is None:
+                return
+
+            all_indices = []
+            for indices in file_dict.values():
+                all_indices.extend(indices)
+
+            chname = self._entries[all_indices[0]].CHNAME
+            self._kill_entries(all_indices)
+
+            if self._name_dict is not None:
+                self._name_dict.pop(chname, None)
+
+        self.logger.debug('{0} removed from ChangeHistory'.format(chname))
+
+        if not self.gui_up:
+            return False
+
+        if (self._selected_path is not None and
+                self._selected_path[0] == self._lc(chname)):
+            self.clear_selected_history()
+        self._remove_subtree((chname,))
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            self._n_dead = 0
+            self._index = {}
+            self._name_dict = None
+        self.clear_selected_history()
+        self.recreate_toc()
+
+    def close(self):
+        self.fv.stop_global_plugin(str(self))
+        return True
+
+    def start(self):
+        self.recreate_toc()
+
+    def stop(self):
+        self.gui_up = False
+        self._refresh_pending = False
+        self._pending_inserts = {}
+        self._pending_deletes = {}
+        self._refresh_timer.stop()
+        self.fv.show_status('')
+
+    def __str__(self):
+        """
+        This method should be provided and should return the lower case
+        name of the plugin.
+        """
+        return 'changehistory'
+
+
+# Append module docstring with config doc for auto insert by Sphinx.
+from ginga.util.toolbox import generate_cfg_example  # noqa
+if __doc__ is not None:
+    __doc__ += generate_cfg_example('plugin_ChangeHistory', package='stginga')
@@ -19,16 +19,18 @@ User has the option to customize flag definitions for different instruments.
 """
 # STDLIB
 import os
+import time
 
 # THIRD-PARTY
 import numpy as np
 from astropy.utils.data import get_pkg_data_filename
 
 # GINGA
+from ginga import colors
 from ginga.GingaPlugin import LocalPlugin
 from ginga.gw import Widgets
 from ginga.misc import Bunch
-from ginga.util.dp import masktorgb
+from ginga.RGBImage import RGBImage
 
 # STGINGA
 from stginga import utils
@@ -105,6 +107,30 @@ class DQInspect(HelpMixin, LocalPlugin, MEFMixin):
         self._curpxmask = {}
         self._curshape = None
 
+        # Composite mask memoized across selection changes
+        self._last_sel = frozenset()
+        self._last_packed = None
+
+        # Persistent RGBA overlay buffers, one per selection slot;
+        # reallocated only when the image shape changes
+        self._rgba_bufs = []
+        self._rgba_cols = []
+
+        # Coalesce redo() bursts (e.g., from cursor drags) to at most
+        # one full recomputation per interval
+        self._redo_min_interval = 0.03  # sec
+        self._last_redo_t = 0.0
+        self._redo_pending = False
+        self._redo_timer = fv.get_timer()
+        self._redo_timer.set_callback('expired', self._redo_timer_cb)
+
+        # Memo for the redo() fast path: while the displayed image is
+        # unchanged, moving the marked pixel only needs a single-pixel
+        # interpretation
+        self._last_image = None
+        self._last_data = None
+        self._last_dqparser = None
+
         # FITS keywords and values from general config
         self.general_mef_settings(prefs)
 
@@ -132,7 +158,9 @@ class DQInspect(HelpMixin, LocalPlugin, MEFMixin):
         canvas.set_surface(self.fitsimage)
         self.canvas = canvas
 
-        fv.add_callback('remove-image', lambda *args: self.redo())
+        fv.add_callback('add-image-info',
+                        lambda *args: self._clear_redo_memo())
+        fv.add_callback('remove-image', self._remove_image_cb)
 
         self.gui_up = False
 
@@ -237,12 +265,14 @@ class DQInspect(HelpMixin, LocalPlugin, MEFMixin):
             return
 
         dqstr = self.settings.get('dqstr', 'long')
-        treedict = Bunch.caselessDict()
 
-        for row in dqs:
-            flag = row[dqparser._dqcol]
-            val = row[dqstr]
-            treedict[str(flag)] = Bunch.Bunch(FLAG=flag, DESCRIP=val)
+        # Flag keys are digits, so a plain dict (and plain dict rows)
+        # is enough for set_tree; pull the columns out once instead of
+        # indexing the table row by row
+        treedict = {}
+        for flag, val in zip(dqs[dqparser._dqcol], dqs[dqstr]):
+            flag = int(flag)
+            treedict[str(flag)] = {'FLAG': flag, 'DESCRIP': str(val)}
 
         self.pxdqlist.set_tree(treedict)
         self.w.dq.set_text(str(pixval))
@@ -253,16 +283,14 @@ class DQInspect(HelpMixin, LocalPlugin, MEFMixin):
             return
 
         dqstr = self.settings.get('dqstr', 'long')
-        treedict = Bunch.caselessDict()
+        treedict = {}
 
         for key in self._curpxmask:
-            if len(self._curpxmask[key][0]) == 0:
+            if not self._curpxmask.flag_any(key):
                 continue
 
-            row = dqparser.tab[dqparser.tab[dqparser._dqcol] == key]
-            flag = row[dqparser._dqcol][0]
-            val = row[dqstr][0]
-            treedict[str(flag)] = Bunch.Bunch(FLAG=flag, DESCRIP=val)
+            val = dqparser._flag_map[key][dqstr]
+            treedict[str(key)] = {'FLAG': key, 'DESCRIP': val}
 
         self.imdqlist.set_tree(treedict)
 
@@ -285,6 +313,8 @@ class DQInspect(HelpMixin, LocalPlugin, MEFMixin):
         if not keep_cache:
             self._curpxmask = None
             self._curshape = None
+            self._last_sel = frozenset()
+            self._last_packed = None
 
         if not self.gui_up:
             return
@@ -327,18 +357,69 @@ class DQInspect(HelpMixin, LocalPlugin, MEFMixin):
 
         return dqp
 
+    def _redo_timer_cb(self, timer):
+        self._redo_pending = False
+        self.fv.gui_do(self.redo)
+
+    def _clear_redo_memo(self):
+        self._last_image = None
+        self._last_data = None
+        self._last_dqparser = None
+
+    def _remove_image_cb(self, *args):
+        self._clear_redo_memo()
+        self.redo()
+
+    def _redo_point_only(self):
+        """Single-pixel part of :meth:`redo`, against memoized data."""
+        data = self._last_data
+        dqparser = self._last_dqparser
+
+        self.w.x.set_text(str(self.xcen))
+        self.w.y.set_text(str(self.ycen))
+        self.clear_pxdq(keep_loc=True)
+
+        ix = int(self.xcen)
+        iy = int(self.ycen)
+        if (0 <= iy < data.shape[0]) and (0 <= ix < data.shape[1]):
+            pixval = data[iy, ix]
+            dqs = dqparser.interpret_dqval(pixval)
+            self.recreate_pxdq(dqparser, dqs, pixval)
+
+        return True
+
     def redo(self):
         """This updates DQ flags."""
         if not self.gui_up:
             return True
 
+        # Debounce: dragging the marker fires redo() per cursor event;
+        # within the gate interval, just arm one deferred rerun that
+        # picks up the final cursor position.
+        now = time.monotonic()
+        if now - self._last_redo_t < self._redo_min_interval:
+            if not self._redo_pending:
+                self._redo_pending = True
+                self._redo_timer.set(
+                    self._redo_min_interval - (now - self._last_redo_t))
+            return True
+        self._last_redo_t = now
+
+        image = self.fitsimage.get_image()
+
+        # Fast path: same displayed image with unmodified data, so
+        # only the marked pixel can have moved. Skip the header,
+        # extension, and cache traversal entirely.
+        if (image is not None and image is self._last_image and
+                self._last_data is not None):
+            return self._redo_point_only()
+
         self.w.x.set_text(str(self.xcen))
         self.w.y.set_text(str(self.ycen))
 
         # Clear previous single-pixel results
         self.clear_pxdq(keep_loc=True)
 
-        image = self.fitsimage.get_image()
         if image is None:
             return self._reset_imdq_on_error()
 
@@ -393,7 +474,7 @@ class DQInspect(HelpMixin, LocalPlugin, MEFMixin):
         # Interpret DQ flags for all pixels if cache not found or outdated.
         # The cache is attached to image object, so that if image is closed
         # etc, the cache is automatically removed.
-        # pixmask_by_flag is {flag: np_index}
+        # pixmask_by_flag is {flag: bool_mask}
         # timestamp is datetime object or None
         if bnch is None or cur_timestamp != bnch.timestamp:
             self.logger.debug('Interpreting all DQs for {0}...'.format(dqname))
@@ -406,6 +487,11 @@ class DQInspect(HelpMixin, LocalPlugin, MEFMixin):
             self.logger.debug('Using cached DQ results for {0}'.format(dqname))
             pixmask_by_flag = bnch.pixmask_by_flag
 
+        # Remember the resolved context for the fast path above
+        self._last_image = image
+        self._last_data = data
+        self._last_dqparser = dqparser
+
         # Parse DQ into individual flag definitions
         ix = int(self.xcen)
         iy = int(self.ycen)
@@ -425,12 +511,47 @@ class DQInspect(HelpMixin, LocalPlugin, MEFMixin):
         # Only list DQ flags present anywhere in the image.
         self._curpxmask = pixmask_by_flag
         self._curshape = data.shape
+        self._last_sel = frozenset()
+        self._last_packed = None
         self.clear_imdq(keep_cache=True)
         self.recreate_imdq(dqparser)
 
         return self.mark_dqs_cb(self.w, self.imdqlist.get_selected())
 
+    def _mask_overlay(self, i, mask, color, alpha):
+        """RGB image overlay for one DQ flag.
+
+        Unlike :func:`~ginga.util.dp.masktorgb`, this reuses a
+        persistent RGBA buffer for the given selection slot, so a
+        selection change rewrites 1 byte per pixel (alpha) instead of
+        allocating and filling a fresh 4-byte-per-pixel buffer.
+
+        """
+        shape = self._curshape + (4, )
+        while len(self._rgba_bufs) <= i:
+            self._rgba_bufs.append(None)
+            self._rgba_cols.append(None)
+        buf = self._rgba_bufs[i]
+
+        if buf is None or buf.shape != shape:
+            buf = self._rgba_bufs[i] = np.zeros(shape, dtype=np.uint8)
+            self._rgba_cols[i] = None
+
+        # RGB planes only need repainting when the slot color changes;
+        # unmasked pixels stay transparent via the alpha plane
+        if self._rgba_cols[i] != color:
+            r, g, b = colors.lookup_color(color)
+            buf[..., 0] = int(r * 255)
+            buf[..., 1] = int(g * 255)
+            buf[..., 2] = int(b * 255)
+            self._rgba_cols[i] = color
+
+        np.multiply(mask, int(alpha * 255), out=buf[..., 3],
+                    casting='unsafe')
+        return RGBImage(data_np=buf)
+
     def _reset_imdq_on_error(self):
+        self._clear_redo_memo()
         self.clear_imdq()
         return self.mark_dqs_cb(self.w, {})
 
@@ -460,7 +581,6 @@ class DQInspect(HelpMixin, LocalPlugin, MEFMixin):
         # To save memory, composite mask is generated on the fly.
         imdqcolors = self.settings.get('imdqcolors', self._def_imdqcolors)
         n_color = len(imdqcolors)
-        mask = np.zeros(self._curshape, dtype=np.bool)
         m_objs = []
 
         # Evenly distribute alpha between all individual masks
@@ -468,27 +588,46 @@ class DQInspect(HelpMixin, LocalPlugin, MEFMixin):
         if n_key > 0:
             imdqalpha = 1.0 / n_key
 
+        # Bulk-materialize the masks needed for the overlays in one
+        # pass over the data
+        self._curpxmask.materialize([int(key) for key in res_dict])
+
         # Only valid DQs are selectable and passed in here
         for i, key in enumerate(res_dict):
             ikey = int(key)
-            mask[self._curpxmask[ikey]] = True  # Composite mask for npix count
 
             # Mask only for that DQ flag, for individual color display
             cur_col = imdqcolors[i % n_color]
-            cur_mask = np.zeros(self._curshape, dtype=np.bool)
-            cur_mask[self._curpxmask[ikey]] = True
             m_objs.append(self.dc.Image(
-                0, 0, masktorgb(cur_mask, color=cur_col, alpha=imdqalpha)))
+                0, 0, self._mask_overlay(i, self._curpxmask[ikey], cur_col,
+                                         imdqalpha)))
 
             # TODO: Better way to report colors used? Cannot set as treeview
             # columns because treeview resets on update.
             self.logger.info('{0}: {1}'.format(key, cur_col))
 
-        # Report number of affected pixels
-        npix = np.count_nonzero(mask)
+        # Composite mask for npix count, OR'ed in bit-packed form
+        # (8 pixels per byte) and unpacked only once. Memoized across
+        # selection changes: toggling one more flag on only ORs that
+        # flag into the previous composite.
+        cur_sel = frozenset(map(int, res_dict))
+        if self._last_packed is not None and cur_sel == self._last_sel:
+            packed = self._last_packed
+        elif self._last_packed is not None and cur_sel > self._last_sel:
+            packed = self._last_packed | self._curpxmask.composite_packed(
+                cur_sel - self._last_sel)
+        else:  # Flag removed; rebuild from remaining selection
+            packed = self._curpxmask.composite_packed(cur_sel)
+        self._last_sel = cur_sel
+        self._last_packed = packed
+
+        # Report number of affected pixels, counted directly on the
+        # packed bytes so the composite is never unpacked
+        npix = self._curpxmask.count(packed)
+        ntot = self._curpxmask.size
         if npix > 0:
             self.w.npix.set_text('{0}/{1} ({2:.3f}%)'.format(
-                npix, mask.size, 100 * npix / mask.size))
+                npix, ntot, 100 * npix / ntot))
         else:
             self.w.npix.set_text('0')
 
@@ -676,7 +815,10 @@ class DQInspect(HelpMixin, LocalPlugin, MEFMixin):
         self.fv.show_status('Mark pixel with the left mouse button')
 
     def stop(self):
+        self._redo_timer.stop()
+        self._redo_pending = False
         self._reset_imdq_on_error()
+        self.close_fits_handles()
 
         # remove the canvas from the image
         p_canvas = self.fitsimage.get_canvas()
@@ -1140,6 +1140,8 @@ class SNRCalc(HelpMixin, LocalPlugin, MEFMixin, ParamMixin):
         self.fv.show_status('Draw a region with the right mouse button')
 
     def stop(self):
+        self.close_fits_handles()
+
         # remove the canvas from the image
         p_canvas = self.fitsimage.get_canvas()
         try:
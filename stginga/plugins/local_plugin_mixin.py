@@ -5,6 +5,7 @@ import json
 import os
 
 # THIRD-PARTY
+from astropy.io import fits
 from astropy.utils.misc import JsonCustomEncoder
 
 # GINGA
@@ -81,6 +82,56 @@ class MEFMixin(object):
         self._extver_key = gen_settings.get('extverkey', 'EXTVER')
         self._ins_key = gen_settings.get('instrumentkey', 'INSTRUME')
 
+    # Keep at most this many FITS handles open per plugin
+    _max_fits_handles = 8
+
+    def _get_fits_handle(self, imfile):
+        """Memory-mapped FITS handle for the given file.
+
+        Handles are cached (keyed by file modification time) so that
+        probing several extensions of the same file does not reopen and
+        rescan it each time. Call :meth:`close_fits_handles` in
+        ``stop()`` to release them.
+
+        """
+        cache = getattr(self, '_open_fits_cache', None)
+        if cache is None:
+            cache = self._open_fits_cache = {}
+
+        mtime = os.path.getmtime(imfile)
+        handle = cache.pop(imfile, None)
+        if handle is not None and handle[0] == mtime:
+            cache[imfile] = handle  # Move to most-recent position
+            return handle[1]
+        if handle is not None:  # File changed on disk
+            handle[1].close()
+
+        pf = fits.open(imfile, memmap=True, lazy_load_hdus=True,
+                       do_not_scale_image_data=True)
+        cache[imfile] = (mtime, pf)
+        while len(cache) > self._max_fits_handles:
+            cache.pop(next(iter(cache)))[1].close()
+        return pf
+
+    def _find_ext(self, imfile, ext):
+        """Like :func:`~stginga.utils.find_ext`, but using the shared
+        memory-mapped handle from :meth:`_get_fits_handle`."""
+        if imfile is None:  # This is needed to handle Ginga mosaic
+            return False
+        try:
+            return ext in self._get_fits_handle(imfile)
+        except Exception:
+            return utils.find_ext(imfile, ext)
+
+    def close_fits_handles(self):
+        """Close any FITS handles opened by :meth:`_get_fits_handle`."""
+        cache = getattr(self, '_open_fits_cache', None)
+        if not cache:
+            return
+        for mtime, pf in cache.values():
+            pf.close()
+        cache.clear()
+
     def _info_for_other_ext(self, image, header):
         """Extract relevant metadata for loading another extension."""
         imfile = image.metadata['path']
@@ -119,7 +170,7 @@ class MEFMixin(object):
 
         err_extnum = (self._err_extname, extver)
         errname = '{0}[{1},{2}]'.format(imname, self._err_extname, extver)
-        errsrc = utils.find_ext(imfile, err_extnum)
+        errsrc = self._find_ext(imfile, err_extnum)
 
         # Load ERR image
         if errsrc:
@@ -158,17 +209,17 @@ class MEFMixin(object):
 
         if instrument != 'WFPC2':
             dqname = '{0}[{1},{2}]'.format(imname, self._dq_extname, extver)
-            dqsrc = utils.find_ext(imfile, dq_extnum)
+            dqsrc = self._find_ext(imfile, dq_extnum)
 
         # Special handling for WFPC2, lots of assumptions
         else:
             imfile = imfile.replace('c0m', 'c1m')
             imname = imname.replace('c0m', 'c1m')
-            dqsrc = utils.find_ext(imfile, dq_extnum)
+            dqsrc = self._find_ext(imfile, dq_extnum)
 
             if not dqsrc:
                 dq_extnum = (self._sci_extname, extver)
-                dqsrc = utils.find_ext(imfile, dq_extnum)
+                dqsrc = self._find_ext(imfile, dq_extnum)
 
             dqname = '{0}[{1},{2}]'.format(imname, dq_extnum[0], extver)
 
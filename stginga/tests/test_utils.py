@@ -117,10 +117,38 @@ def test_dq_parser():
     dqs = parsedq.interpret_dqval(16658)
     assert sorted(dqs['DQFLAG']) == [2, 16, 256, 16384]
 
-    # Array
+    # Array, interpreted as boolean masks
     dqs = parsedq.interpret_array([1, 1, 16658, 0])
-    assert_array_equal(dqs[1][0], [0, 1])
+    assert_array_equal(dqs[1], [True, True, False, False])
     for i in [2, 16, 256, 16384]:
-        assert_array_equal(dqs[i][0], [2])
+        assert_array_equal(dqs[i], [False, False, True, False])
     for i in [4, 8, 32, 64, 128, 512, 1024, 2048, 4096, 8192, 32768]:
-        assert len(dqs[i][0]) == 0
+        assert not dqs[i].any()
+
+    # Native 16-bit input must not be upcast and the highest flag bit
+    # must still be interpreted correctly
+    dqs = parsedq.interpret_array(np.array([[32768, 0]], dtype=np.uint16))
+    assert_array_equal(dqs[32768], [[True, False]])
+    assert dqs[32768].dtype == np.bool_
+
+
+def test_dq_parser_compound_flags():
+    """Compound (non-power-of-two) flags match on any shared bit."""
+    parsedq = DQParser(
+        '# INSTRUMENT = TEST\n'
+        'DQFLAG SHORT_DESCRIPTION LONG_DESCRIPTION\n'
+        '0 "OK" "Good pixel"\n'
+        '2 "A" "Flag A"\n'
+        '4 "B" "Flag B"\n'
+        '6 "AB" "Compound of A and B"\n')
+
+    assert sorted(parsedq.interpret_dqval(6)['DQFLAG']) == [2, 4, 6]
+    assert sorted(parsedq.interpret_dqval(2)['DQFLAG']) == [2, 6]
+    assert parsedq.interpret_dqval(0)['DQFLAG'].tolist() == [0]
+
+
+def test_dq_parser_signed_dqval():
+    """Signed DQ storage (e.g., int16 HDU) must not sign-extend."""
+    parsedq = DQParser(get_pkg_data_filename('../data/dqflags_acs.txt'))
+    dqs = parsedq.interpret_dqval(np.int16(-32768))
+    assert dqs['DQFLAG'].tolist() == [32768]
@@ -1,12 +1,14 @@
 """Utility functions for ``stginga``."""
 # STDLIB
+import functools
 import os
+import shlex
 import warnings
 
 # THIRD-PARTY
 import numpy as np
 from astropy import wcs
-from astropy.io import ascii, fits
+from astropy.io import fits
 from astropy.stats import biweight_location
 from astropy.stats import sigma_clip
 from astropy.utils import minversion
@@ -14,11 +16,90 @@ from astropy.utils.exceptions import AstropyUserWarning
 from scipy.interpolate import griddata
 from scipy.ndimage.interpolation import zoom
 
+# OPTIONAL
+try:
+    import numba
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
 ASTROPY_LT_3_1 = not minversion('astropy', '3.1')
 GINGA_LT_3 = not minversion('ginga', '3.0')
 
+if HAS_NUMBA:
+    @numba.njit(parallel=True, cache=True)
+    def _decompose_dq(data, flags, out):
+        """Fill ``out[k]`` with the boolean mask for ``flags[k]``.
+
+        One threaded pass over the flattened DQ array; ``data`` is read
+        once per element instead of once per flag.
+
+        """
+        nflags = flags.shape[0]
+        for i in numba.prange(data.shape[0]):
+            v = data[i]
+            for k in range(nflags):
+                out[k, i] = (v & flags[k]) != 0
+
+# Column dtype for parsed DQ flag definition tables
+_DQ_DEF_DTYPE = [('DQFLAG', 'u2'), ('short', 'U32'), ('long', 'U128')]
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_dq_def(definition):
+    """Parse a DQ flag definition table (see `DQParser`).
+
+    ``definition`` is either a filename or the table contents itself
+    (anything containing a newline). Results are cached per input, so
+    repeated parser construction for the same definition file is free.
+
+    Returns ``(tab, metadata)`` where ``tab`` is a structured ndarray
+    with ``DQFLAG``, ``short``, and ``long`` fields and ``metadata``
+    is a dict built from the ``# KEY = VAL`` comment lines.
+
+    """
+    if '\n' in definition:
+        lines = definition.splitlines()
+    else:
+        # Need to replace ~ with $HOME
+        with open(os.path.expanduser(definition)) as fin:
+            lines = fin.read().splitlines()
+
+    metadata = {}
+    rows = []
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('#'):  # Metadata, e.g., # TELESCOPE = HST
+            if '=' in line:
+                key, val = line.lstrip('#').split('=', 1)
+                metadata[key.strip()] = val.strip()
+            continue
+        cols = shlex.split(line)
+        if len(cols) != 3 or not cols[0].isdigit():  # Header row
+            continue
+        rows.append((int(cols[0]), cols[1], cols[2]))
+
+    return np.array(rows, dtype=_DQ_DEF_DTYPE), metadata
+
+
+# np.bitwise_count (NumPy 2.0) maps to hardware POPCNT; older NumPy
+# falls back to a 256-entry lookup table, still 8x cheaper than
+# counting booleans because the packed array is 1/8 the size.
+if hasattr(np, 'bitwise_count'):
+    def _popcount(packed):
+        return int(np.bitwise_count(packed).sum(dtype=np.int64))
+else:
+    _POPCNT_LUT = np.array([bin(i).count('1') for i in range(256)],
+                           dtype=np.uint8)
+
+    def _popcount(packed):
+        return int(_POPCNT_LUT[packed].sum(dtype=np.int64))
+
 __all__ = ['calc_stat', 'interpolate_badpix', 'find_ext', 'DQParser',
-           'scale_image']
+           'DQFlagMasks', 'scale_image']
 
 
 def calc_stat(data, sigma=1.8, niter=10, algorithm='median'):
@@ -105,9 +186,27 @@ def interpolate_badpix(image, badpix_mask, basis_mask, method='linear'):
     image[badpix_mask] = griddata((x, y), z, (xnew, ynew), method=method)
 
 
+@functools.lru_cache(maxsize=128)
+def _find_ext(imfile, mtime, ext):
+    """Memoized worker for :func:`find_ext`.
+
+    ``mtime`` is only part of the cache key, so a modified file gets
+    probed again. HDU data is never touched, hence the lazy
+    memory-mapped open.
+
+    """
+    with fits.open(imfile, memmap=True, lazy_load_hdus=True,
+                   do_not_scale_image_data=True) as pf:
+        has_ext = ext in pf
+    return has_ext
+
+
 def find_ext(imfile, ext):
     """Determine whether given FITS file has the requested extension.
 
+    Results are cached, so repeated look-ups of an unchanged file
+    (e.g., from every plugin redraw) do not reopen it.
+
     Parameters
     ----------
     imfile : str
@@ -128,9 +227,188 @@ def find_ext(imfile, ext):
     """
     if imfile is None:  # This is needed to handle Ginga mosaic
         return False
-    with fits.open(imfile) as pf:
-        has_ext = ext in pf
-    return has_ext
+    return _find_ext(imfile, os.path.getmtime(imfile), ext)
+
+
+class DQFlagMasks(object):
+    """Mapping of DQ flag to boolean mask of affected array elements.
+
+    Masks are materialized lazily: a flag is only decomposed from the
+    DQ array the first time it is accessed, since users typically
+    inspect a handful of the 16 possible flags. Once computed, masks
+    are stored bit-packed (1 bit per pixel, see
+    :func:`numpy.packbits`), which cuts their memory footprint and the
+    bandwidth of combining them by a factor of 8 compared to plain
+    boolean arrays. ``masks[flag]`` unpacks the mask for one flag on
+    demand; use :meth:`flag_any` to test for presence and
+    :meth:`composite_packed` to OR several flags without unpacking.
+
+    Parameters
+    ----------
+    data : ndarray
+        DQ array (``uint16``).
+
+    flags : array-like
+        Valid flag values.
+
+    """
+    def __init__(self, data, flags):
+        self._data = data
+        self._shape = data.shape
+        self._size = data.size
+        self._flags = tuple(int(vf) for vf in flags)
+        self._packed = {}
+        self._any = {}
+
+        # Scratch buffers reused by every decomposition, so repeated
+        # selection changes do not reallocate full-size temporaries
+        self._and_buf = None
+        self._mask_buf = None
+
+    def _masked_ne(self, combined):
+        """``(data & combined) != 0`` using reusable scratch buffers.
+
+        The returned mask aliases internal scratch space; pack or copy
+        it before the next call.
+
+        """
+        if self._mask_buf is None:
+            self._and_buf = np.empty(self._size, dtype=np.uint16)
+            self._mask_buf = np.empty(self._size, dtype=np.bool_)
+        np.bitwise_and(self._data.ravel(), np.uint16(combined),
+                       out=self._and_buf)
+        return np.not_equal(self._and_buf, 0, out=self._mask_buf)
+
+    def _bitplane_chunks(self, chunklen=1 << 20):
+        """Yield all 16 bit-planes of the data, chunk by chunk.
+
+        ``np.unpackbits`` on a little-endian byte view emits the planes
+        for 8 bits per input byte in a single C pass; chunking bounds
+        the transient plane buffer to ``16 * chunklen`` bytes.
+
+        """
+        data = self._data.ravel()
+        if data.dtype.str != '<u2':
+            data = data.astype('<u2')
+        for start in range(0, data.size, chunklen):
+            chunk = data[start:start + chunklen]
+            yield np.unpackbits(chunk.view(np.uint8).reshape(-1, 2),
+                                axis=-1, bitorder='little').reshape(-1, 16)
+
+    def materialize(self, flags=None):
+        """Decompose the given flags (default: all) in bulk.
+
+        For two or more pending power-of-two flags, all their masks are
+        extracted from shared bit-planes in one streaming pass over the
+        data, instead of one full pass per flag.
+
+        """
+        if flags is None:
+            flags = self._flags
+        todo = [flag for flag in flags if flag not in self._packed]
+
+        # A single flag is one pass either way
+        pow2 = [flag for flag in todo if flag and (flag & (flag - 1)) == 0]
+        if len(pow2) > 1:
+            parts = dict((flag, []) for flag in pow2)
+            for bits in self._bitplane_chunks():
+                for flag in pow2:
+                    parts[flag].append(
+                        np.packbits(bits[:, flag.bit_length() - 1]))
+            for flag in pow2:
+                self._packed[flag] = np.concatenate(parts[flag])
+            todo = [flag for flag in todo if flag not in pow2]
+
+        for flag in todo:  # Leftovers, e.g., compound flag definitions
+            self._packed_mask(flag)
+
+    def _packed_mask(self, flag):
+        """Bit-packed mask for one flag, computed on first access."""
+        try:
+            return self._packed[flag]
+        except KeyError:
+            pass
+
+        if HAS_NUMBA:
+            if self._mask_buf is None:
+                self._and_buf = np.empty(self._size, dtype=np.uint16)
+                self._mask_buf = np.empty(self._size, dtype=np.bool_)
+            out = self._mask_buf.reshape(1, self._size)
+            _decompose_dq(self._data.ravel(),
+                          np.asarray([flag], dtype=np.uint16), out)
+            mask = out[0]
+        else:
+            mask = self._masked_ne(flag)
+
+        packed = self._packed[flag] = np.packbits(mask)
+        return packed
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def size(self):
+        return self._size
+
+    def __getitem__(self, flag):
+        return self.unpack(self._packed_mask(flag))
+
+    def __contains__(self, flag):
+        return flag in self._flags
+
+    def __iter__(self):
+        return iter(self._flags)
+
+    def __len__(self):
+        return len(self._flags)
+
+    def keys(self):
+        return self._flags
+
+    def flag_any(self, flag):
+        """`True` if any element has the given flag set."""
+        if flag not in self._any:
+            if flag in self._packed:
+                has_flag = bool(self._packed[flag].any())
+            else:
+                # Single C-level reduction; no mask is materialized
+                # just to test presence
+                has_flag = bool((self._data & np.uint16(flag)).any())
+            self._any[flag] = has_flag
+        return self._any[flag]
+
+    def packed(self, flag):
+        """Bit-packed mask for the given flag."""
+        return self._packed_mask(flag)
+
+    def composite_packed(self, flags):
+        """Bit-packed OR of the masks for the given flags."""
+        flags = list(flags)
+
+        # If some flags are not materialized yet, testing the data
+        # against the OR of the flag values in one fused pass is
+        # cheaper than decomposing each flag first.
+        if any(flag not in self._packed for flag in flags):
+            combined = 0
+            for flag in flags:
+                combined |= flag
+            return np.packbits(self._masked_ne(combined))
+
+        # All masks already packed; OR the bytes (1/8 the bandwidth)
+        out = np.zeros((self._size + 7) // 8, dtype=np.uint8)
+        for flag in flags:
+            out |= self._packed[flag]
+        return out
+
+    def unpack(self, packed):
+        """Expand a bit-packed mask back to a boolean array."""
+        mask = np.unpackbits(packed, count=self._size)
+        return mask.view(np.bool_).reshape(self._shape)
+
+    def count(self, packed):
+        """Number of set bits in a bit-packed mask."""
+        return _popcount(packed)
 
 
 # STScI reftools.interpretdq.DQParser class modified for Ginga plugin.
@@ -161,20 +439,19 @@ class DQParser(object):
         1      "LOST"            "Lost during compression"
         ...    ...               ...
 
-    The table format must be readable by ``astropy.io.ascii``.
-
     Parameters
     ----------
     definition_file : str
         ASCII table that defines the DQ flags (see above).
+        Can also be the table contents itself.
 
     Attributes
     ----------
-    tab : ``astropy.table.Table``
-        Table object from given definition file.
+    tab : ndarray
+        Structured array from given definition file.
 
-    metadata : ``astropy.table.Table``
-        Table object from file metadata.
+    metadata : dict
+        Dictionary built from file metadata.
 
     """
     def __init__(self, definition_file):
@@ -182,28 +459,42 @@ class DQParser(object):
         self._sdcol = 'short'  # SHORT_DESCRIPTION
         self._ldcol = 'long'   # LONG_DESCRIPTION
 
-        # Need to replace ~ with $HOME
-        self.tab = ascii.read(
-            os.path.expanduser(definition_file),
-            names=(self._dqcol, self._sdcol, self._ldcol),
-            converters={self._dqcol: [ascii.convert_numpy(np.uint16)],
-                        self._sdcol: [ascii.convert_numpy(np.str)],
-                        self._ldcol: [ascii.convert_numpy(np.str)]})
-
-        # Another table to store metadata
-        self.metadata = ascii.read(self.tab.meta['comments'], delimiter='=',
-                                   format='no_header', names=['key', 'val'])
+        # Parsed directly (and cached per definition file); astropy's
+        # ascii.read machinery is overkill for these tiny tables and
+        # dominated plugin startup.
+        tab, self.metadata = _parse_dq_def(definition_file)
 
         # Ensure table has OK flag to detect good pixel
         self._okflag = 0
-        if self._okflag not in self.tab[self._dqcol]:
-            self.tab.add_row([self._okflag, 'OK', 'Good pixel'])
-
-        # Sort table in ascending order
-        self.tab.sort(self._dqcol)
-
-        # Compile a list of flags
-        self._valid_flags = self.tab[self._dqcol]
+        if self._okflag not in tab[self._dqcol]:
+            okrow = np.array([(self._okflag, 'OK', 'Good pixel')],
+                             dtype=_DQ_DEF_DTYPE)
+            tab = np.concatenate((tab, okrow))
+
+        # Sort table in ascending order (copies, so the parse cache
+        # shared between instances is never mutated)
+        self.tab = np.sort(tab, order=self._dqcol)
+
+        # Compile a list of flags. Field views of a structured array
+        # are strided; a contiguous uint16 copy keeps the bitwise ops
+        # in interpret_array/interpret_dqval on the fast SIMD path.
+        self._valid_flags = np.ascontiguousarray(self.tab[self._dqcol],
+                                                 dtype=np.uint16)
+
+        # Flag value to table row, for O(1) single-pixel lookups.
+        # The bit scan in interpret_dqval only matches single-bit
+        # flags; custom tables may define compound ones.
+        self._bit_to_row = dict(
+            (int(f), i) for i, f in enumerate(self._valid_flags))
+        self._has_compound = any(
+            f & (f - 1) for f in self._bit_to_row)
+
+        # Flag value to descriptions, so callers do not have to filter
+        # the table per flag
+        self._flag_map = dict(
+            (int(f), {self._sdcol: str(sd), self._ldcol: str(ld)})
+            for f, sd, ld in zip(self._valid_flags, self.tab[self._sdcol],
+                                 self.tab[self._ldcol]))
 
     def interpret_array(self, data):
         """Interpret DQ values for an array.
@@ -220,21 +511,20 @@ class DQParser(object):
 
         Returns
         -------
-        dqs_by_flag : dict
-            Dictionary mapping each interpreted DQ value to indices
-            of affected array elements.
+        dqs_by_flag : `DQFlagMasks`
+            Mapping of each interpreted DQ value to a boolean mask of
+            affected array elements. Masks are materialized lazily and
+            stored bit-packed.
 
         """
-        data = np.asarray(data, dtype=np.int)  # Ensure int array
-        dqs_by_flag = {}
-
-        def _one_flag(vf):
-            dqs_by_flag[vf] = np.where((data & vf) != 0)
-
-        # Skip good flag
-        list(map(_one_flag, self._valid_flags[1:]))
-
-        return dqs_by_flag
+        # DQ flags fit in uint16. Boolean masks are stored instead of
+        # np.where() indices; they are cheaper to build (one bitwise-AND
+        # pass per flag over a compact array, no index materialization)
+        # and cheaper to combine downstream. Decomposition is deferred
+        # to first access per flag, since users typically only inspect
+        # a few of them.
+        data = np.ascontiguousarray(data, dtype=np.uint16)
+        return DQFlagMasks(data, self._valid_flags[1:])  # Skip good flag
 
     def interpret_dqval(self, dqval):
         """Interpret DQ values for a single pixel.
@@ -246,20 +536,37 @@ class DQParser(object):
 
         Returns
         -------
-        dqs : ``astropy.table.Table``
-            Table object containing a list of interpreted DQ values and
-            their meanings.
+        dqs : ndarray
+            Structured array containing a list of interpreted DQ
+            values and their meanings.
 
         """
-        dqval = int(dqval)
+        # DQ arrays may be stored as int16; mask to the uint16 domain
+        # (consistent with interpret_array) so a sign-extended bit 15
+        # cannot make the bit scan below loop forever
+        dqval = int(dqval) & 0xFFFF
 
-        # Good pixel, nothing to do
+        # Good pixel, nothing to do. Table is sorted, so the OK flag
+        # is the first row.
         if dqval == self._okflag:
-            idx = np.where(self.tab[self._dqcol] == self._okflag)
-
-        # Find all the possible DQ flags
-        else:
-            idx = (dqval & self._valid_flags) != 0
+            return self.tab[:1]
+
+        # Compound flag definitions share bits with other flags and
+        # cannot be matched by a per-bit scan; use the vectorized
+        # compare over the whole flag column instead.
+        if self._has_compound:
+            return self.tab[(dqval & self._valid_flags) != 0]
+
+        # Enumerate set bits directly instead of AND'ing against the
+        # whole flag column; this runs on every cursor drag, and a DQ
+        # value only has a handful of bits set.
+        idx = []
+        while dqval:
+            lsb = dqval & (-dqval)  # Lowest set bit
+            row = self._bit_to_row.get(lsb)
+            if row is not None:
+                idx.append(row)
+            dqval ^= lsb
 
         return self.tab[idx]
 